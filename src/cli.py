@@ -0,0 +1,149 @@
+# src/cli.py
+# One entry point for the whole pipeline:
+#   python src\cli.py pull | frames | prices | normalize  [--shard i/N]
+#   python src\cli.py merge | comps | dcf | summary | reverse | serve        (full universe only)
+# Stage modules are imported only by the subcommand that runs them, and each stage imports its
+# heavy dependencies (pandas, openpyxl, yfinance) inside its functions, so --help stays instant.
+import argparse, sys
+from shard import parse_shard
+
+def _shard_opt(p):
+    p.add_argument("--shard", type=parse_shard, default=None, metavar="i/N",
+                   help="only the i-th of N hash partitions; outputs go to shards/{i}of{N}/")
+
+def cmd_pull(args):
+    if args.stream:
+        import stream_financials
+        stream_financials.run(args.shard, args.workers, args.queue_size, args.pause, args.save_raw)
+    else:
+        import pull_sec_companyfacts
+        pull_sec_companyfacts.run(args.shard)
+
+def cmd_frames(args):
+    import frames_financials
+    frames_financials.run(args.shard, args.from_year, args.to_year, args.all_filers,
+                          args.base_url, args.pause, args.save_raw, args.resume)
+
+def cmd_prices(args):
+    if args.rebuild:
+        import rebuild_latest_prices
+        rebuild_latest_prices.run(args.shard)
+    else:
+        import pull_prices_and_rf
+        pull_prices_and_rf.run(args.shard)
+
+def cmd_normalize(args):
+    import normalize_financials
+    normalize_financials.run(args.shard)
+
+def cmd_comps(args):
+    import build_comps_and_model
+    build_comps_and_model.run()
+
+def cmd_dcf(args):
+    import build_dcf_per_company
+    build_dcf_per_company.run(formulas=args.formulas)
+    if args.pack:
+        import build_dcf_tab
+        build_dcf_tab.run()
+
+def cmd_summary(args):
+    from build_dcf_per_company import read_summary
+    rows = read_summary()
+    if not rows:
+        print("Valuation_Summary is empty.")
+        return
+    cols = list(rows[0])
+    fmt = lambda v: "" if v is None else (f"{v:,.2f}" if isinstance(v, float) else str(v))
+    table = [cols] + [[fmt(r[c]) for c in cols] for r in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(cols))]
+    for row in table:
+        print("  ".join(v.rjust(w) if i else v.ljust(w) for i, (v, w) in enumerate(zip(row, widths))))
+    if any(r.get("Implied Price") is None for r in rows):
+        print("(blank cells: formula-mode workbook not yet recalculated/saved in Excel)")
+
+def cmd_reverse(args):
+    import reverse_dcf
+    reverse_dcf.run(args.solve, args.lo, args.hi, args.rtol, args.max_iter, args.sheet)
+
+def cmd_merge(args):
+    import merge_shards
+    merge_shards.run(pack_dcf=not args.no_pack_dcf, formulas=args.formulas)
+
+def cmd_serve(args):
+    import valuation_service
+    valuation_service.run(args.host, args.port, args.cache_size, args.verbose)
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="cli.py", description="SEC DCF & comps pipeline")
+    sub = ap.add_subparsers(dest="command", metavar="command", required=True)
+
+    p = sub.add_parser("pull", help="download SEC companyfacts (needs USER_AGENT)")
+    _shard_opt(p)
+    p.add_argument("--stream", action="store_true", help="download and normalize in one overlapped pass")
+    p.add_argument("--workers", type=int, default=2, help="(--stream) normalization worker threads")
+    p.add_argument("--queue-size", type=int, default=4, help="(--stream) max downloaded payloads held in memory")
+    p.add_argument("--pause", type=float, default=0.2, help="(--stream) seconds between SEC requests")
+    p.add_argument("--save-raw", action="store_true", help="(--stream) also keep data_raw/{TKR}_companyfacts.json")
+    p.set_defaults(func=cmd_pull)
+
+    p = sub.add_parser("frames", help="financials_tidy.csv from SEC XBRL frames (one request per tag/year)")
+    _shard_opt(p)
+    p.add_argument("--from-year", type=int, default=None, help="first calendar year (default: to-year - 4)")
+    p.add_argument("--to-year", type=int, default=None, help="last calendar year (default: last year)")
+    p.add_argument("--all-filers", action="store_true", help="keep every filer in the frames, not just CIK_MAP")
+    p.add_argument("--base-url", default="https://data.sec.gov/api/xbrl/frames",
+                   help="frames API root (point at frames_fixture_server.py offline)")
+    p.add_argument("--pause", type=float, default=0.2, help="seconds between requests")
+    p.add_argument("--save-raw", action="store_true", help="also keep data_raw/frames/ (fixture layout)")
+    p.add_argument("--resume", action="store_true", help="reuse frames already saved in data_raw/frames/")
+    p.set_defaults(func=cmd_frames)
+
+    p = sub.add_parser("prices", help="pull prices (yfinance) and the 10Y risk-free rate (FRED)")
+    _shard_opt(p)
+    p.add_argument("--rebuild", action="store_true", help="rebuild latest_prices.csv from the saved price history")
+    p.set_defaults(func=cmd_prices)
+
+    p = sub.add_parser("normalize", help="companyfacts JSON -> data_proc/financials_tidy.csv")
+    _shard_opt(p)
+    p.set_defaults(func=cmd_normalize)
+
+    p = sub.add_parser("comps", help="build comps.csv and a fresh valuation_pack.xlsx")
+    p.set_defaults(func=cmd_comps)
+
+    p = sub.add_parser("dcf", help="per-company DCF tabs + Valuation_Summary")
+    p.add_argument("--formulas", action="store_true", help="write Excel formulas instead of values")
+    p.add_argument("--pack", action="store_true", help="also rebuild the pack-average DCF_Model tab")
+    p.set_defaults(func=cmd_dcf)
+
+    p = sub.add_parser("summary", help="print Valuation_Summary from the workbook")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser("reverse", help="solve the growth or WACC implied by market prices")
+    p.add_argument("--solve", choices=["growth", "wacc"], default="growth", help="which input to back out")
+    p.add_argument("--lo", type=float, default=None, help="bracket low (decimal; default -0.5 growth / tg+0.1%% WACC)")
+    p.add_argument("--hi", type=float, default=None, help="bracket high (decimal; default 1.0)")
+    p.add_argument("--rtol", type=float, default=1e-8, help="relative price tolerance")
+    p.add_argument("--max-iter", type=int, default=60)
+    p.add_argument("--sheet", action="store_true", help="also write a Reverse_DCF tab to the workbook")
+    p.set_defaults(func=cmd_reverse)
+
+    p = sub.add_parser("merge", help="combine shards/{i}of{N}/ outputs, then build comps + DCFs on the merged universe")
+    p.add_argument("--formulas", action="store_true", help="write the per-company DCF tabs as Excel formulas")
+    p.add_argument("--no-pack-dcf", action="store_true", help="skip rebuilding DCF_Model on the merged universe")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser("serve", help="run the localhost what-if valuation service")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--cache-size", type=int, default=4096, help="LRU entries (normalized input sets)")
+    p.add_argument("--verbose", action="store_true", help="log every request")
+    p.set_defaults(func=cmd_serve)
+    return ap
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
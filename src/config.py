@@ -5,11 +5,6 @@ load_dotenv()
 USER_AGENT = os.getenv("USER_AGENT")
 FRED_API_KEY = os.getenv("FRED_API_KEY")
 
-if not USER_AGENT:
-    raise RuntimeError("Missing USER_AGENT. Set it in your .env file.")
-if not FRED_API_KEY:
-    print("[WARN] FRED_API_KEY missing — required for the FRED script later.")
-
 HEADERS = {"User-Agent": USER_AGENT}
 
 TICKERS = ["TDOC", "LH", "DGX"]
@@ -19,3 +14,14 @@ CIK_MAP = {
     "LH": "0000920148",
     "DGX": "0001022079",
 }
+
+# Validated by the stages that need them, so offline stages run without a .env
+def require_user_agent():
+    if not USER_AGENT:
+        raise RuntimeError("Missing USER_AGENT. Set it in your .env file.")
+    return HEADERS
+
+def require_fred_key():
+    if not FRED_API_KEY:
+        raise RuntimeError("FRED_API_KEY missing in .env")
+    return FRED_API_KEY
@@ -0,0 +1,266 @@
+# src/dcf_core.py
+# Per-company DCF math shared by build_dcf_per_company.py and the valuation service.
+# Everything after company_inputs() is plain float arithmetic so repeated what-ifs stay cheap;
+# pandas is imported inside the loaders only.
+import math
+
+N_YEARS = 5
+
+OVERRIDE_LABELS = ["Growth (rev %)", "EBIT margin (%)", "D&A (% rev)", "CapEx (% rev)",
+                   "ΔNWC (% rev)", "Terminal g (%)", "Tax rate (%)"]
+
+# ----------------- Workbook / CSV readers -----------------
+def read_assumption(ws, label, default=None):
+    for row in ws.iter_rows(min_row=2, max_col=3, values_only=True):
+        a = row[0] if row else None
+        if a and str(a).strip().lower().startswith(label.lower()):
+            try:
+                return float(row[1])
+            except Exception:
+                return default
+    return default
+
+def read_override(ws, label, default=None):
+    # Start at the override block: the assumption rows above reuse some labels (and hold formulas in --formulas mode)
+    start = next((r[0].row for r in ws.iter_rows(min_row=1, max_row=40, max_col=1)
+                  if str(r[0].value).startswith("Override Inputs")), 1)
+    for r in ws.iter_rows(min_row=start, max_row=40, min_col=1, max_col=2):
+        a = r[0].value
+        if a and str(a).strip().lower().startswith(label.lower()):
+            try:
+                return float(r[1].value)
+            except Exception:
+                return default
+    return default
+
+def _scan_overrides(rows, found):
+    for a, v in rows:
+        if not a:
+            continue
+        label = str(a).strip().lower()
+        for k in OVERRIDE_LABELS:
+            if label.startswith(k.lower()):
+                if k not in found:  # first matching row wins, as in read_override()
+                    try:
+                        found[k] = float(v)
+                    except Exception:
+                        found[k] = None
+                break
+        if len(found) == len(OVERRIDE_LABELS):
+            return True
+    return False
+
+def read_overrides(ws):
+    """
+    All OVERRIDE_LABELS in one lazy pass from the "Override Inputs" row, stopping once every label
+    is found (in read-only mode the rest of the sheet is never parsed).
+    """
+    rows = ws.iter_rows(min_row=1, max_row=40, max_col=2, values_only=True)
+    found = {}
+    if any(str(r[0]).startswith("Override Inputs") for r in rows):
+        _scan_overrides(rows, found)
+    else:  # no block header (older sheets): scan from the top like read_override()
+        _scan_overrides(ws.iter_rows(min_row=1, max_row=40, max_col=2, values_only=True), found)
+    return {k: found.get(k) for k in OVERRIDE_LABELS}
+
+def read_baseline(wsA):
+    """Assumptions sheet -> dict of percents/beta, with the same defaults as the DCF builders."""
+    base = {
+        "Rf":       read_assumption(wsA, "Risk-free", default=None),
+        "ERP":      read_assumption(wsA, "ERP",      default=5.5),
+        "tax_rate": read_assumption(wsA, "Tax rate", default=25.0),
+        "g_pct":    read_assumption(wsA, "Terminal growth", default=2.5),
+        "beta_u":   read_assumption(wsA, "Industry beta",  default=0.85),
+    }
+    if base["Rf"] is None: raise SystemExit("[ERR] Risk-free (10Y, %) missing in Assumptions.")
+    return base
+
+def load_comps(proc_dir):
+    import pandas as pd
+    df = pd.read_csv(proc_dir / "comps.csv", encoding="utf-8-sig")
+    # normalize headers and ticker
+    df.columns = [c.encode("utf-8","ignore").decode("utf-8").strip().lower() for c in df.columns]
+    if "ticker" not in df.columns:
+        raise SystemExit("[ERR] comps.csv missing 'ticker' column. Rebuild comps.")
+    df["ticker"] = df["ticker"].astype(str).str.strip().str.upper()
+    # numeric coercion
+    for col in ["price","dilutedshares","equityvalue","netdebt","ev","revenue (fy)","ebit (fy)"]:
+        if col in df.columns: df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+def load_lastfy(proc_dir):
+    import pandas as pd
+    fin = pd.read_csv(proc_dir / "financials_tidy.csv", encoding="utf-8-sig")
+    fin["ticker"] = fin["ticker"].astype(str).str.strip().str.upper()
+    return fin.sort_values(["ticker", "fy"]).groupby("ticker").tail(1).set_index("ticker")
+
+def load_prices(proc_dir):
+    import pandas as pd
+    try:
+        latest_px = pd.read_csv(proc_dir / "latest_prices.csv").set_index("ticker")["last_price"]
+        latest_px.index = latest_px.index.astype(str).str.strip().str.upper()
+    except Exception:
+        latest_px = pd.Series(dtype=float)
+    return latest_px
+
+def scale_shares_if_needed(sh):
+    import pandas as pd
+    if pd.isna(sh): return sh
+    if sh < 10_000:  # looks like "in millions"
+        return sh * 1_000_000
+    return sh
+
+def load_universe(root):
+    """
+    Everything a what-if needs, as plain Python: Assumptions baseline, per-ticker inputs,
+    overrides saved on the {TKR}_DCF tabs, and latest market prices.
+    """
+    from openpyxl import load_workbook
+    proc = root / "data_proc"
+    wb_path = root / "model/valuation_pack.xlsx"
+    if not wb_path.exists():
+        raise SystemExit(f"[ERR] {wb_path.as_posix()} not found. Run build_comps_and_model.py first.")
+    comps, lastfy = load_comps(proc), load_lastfy(proc)
+    tickers = comps["ticker"].dropna().astype(str).str.strip().str.upper().unique().tolist()
+    comps_ix = comps.set_index("ticker")  # once, not per company_inputs() call
+    inputs = {t: company_inputs(t, comps_ix, lastfy) for t in tickers}
+    # read_only parses a sheet only when its rows are iterated; read_overrides() stops after the
+    # override block. Map titles once: wb[name] is a linear scan, so per-ticker lookups were O(n^2).
+    wb = load_workbook(wb_path, read_only=True)
+    try:
+        sheets = {ws.title: ws for ws in wb.worksheets}
+        base = read_baseline(sheets["Assumptions"])
+        stored = {t: (read_overrides(sheets[f"{t}_DCF"]) if f"{t}_DCF" in sheets else {}) for t in tickers}
+    finally:
+        wb.close()
+    px = load_prices(proc)
+    prices = {t: float(px[t]) for t in tickers if t in px.index}
+    return {"tickers": tickers, "base": base, "inputs": inputs, "stored": stored, "prices": prices}
+
+# ----------------- Per-company inputs -----------------
+def company_inputs(t, comps, lastfy):
+    """
+    Revenue base, EBIT margin, shares, net debt and D/E for one ticker (facts -> comps -> pack fallbacks).
+    `comps` may already be indexed by ticker, which saves a re-index per call when looping a universe.
+    """
+    import pandas as pd
+    row_c = (comps.set_index("ticker") if "ticker" in comps.columns else comps).loc[t].to_dict()
+    row_f = lastfy.loc[t].to_dict() if t in lastfy.index else {}  # one lookup, plain dict access after
+
+    # Revenue base: prefer tidy; else comps FY; else pack average; else $1B
+    if pd.notnull(row_f.get("revenue")):
+        revenue_base = float(row_f["revenue"])
+    elif pd.notnull(row_c.get("revenue (fy)")):
+        revenue_base = float(row_c["revenue (fy)"])
+    else:
+        pack_rev = pd.to_numeric(comps["revenue (fy)"], errors="coerce")
+        revenue_base = float(pack_rev.dropna().mean()) if pack_rev.notna().any() else 1_000_000_000.0
+    if not (math.isfinite(revenue_base) and revenue_base > 1e6):
+        revenue_base = 1_000_000_000.0
+
+    # EBIT margin: from comps if sane; else 10%
+    rev_fy = float(row_c.get("revenue (fy)")) if pd.notnull(row_c.get("revenue (fy)")) and row_c.get("revenue (fy)") != 0 else 1.0
+    ebit_margin = float(row_c.get("ebit (fy)")/rev_fy) if pd.notnull(row_c.get("ebit (fy)")) else 0.10
+    if not (0.0 < ebit_margin < 0.30):
+        ebit_margin = 0.10
+
+    # Shares: comps -> tidy -> median; then scale if in millions
+    if pd.notnull(row_c.get("dilutedshares")):
+        shares = float(row_c["dilutedshares"])
+    elif pd.notnull(row_f.get("diluted_shares")):
+        shares = float(row_f["diluted_shares"])
+    else:
+        shares = float(pd.to_numeric(comps["dilutedshares"], errors="coerce").median(skipna=True) or 1.0)
+    shares = scale_shares_if_needed(shares)
+
+    # Net Debt: from comps (fallback 0)
+    net_debt = float(row_c.get("netdebt")) if pd.notnull(row_c.get("netdebt")) else 0.0
+
+    # D/E from comps approx
+    de_ratio = 0.0
+    if pd.notnull(row_c.get("netdebt")) and pd.notnull(row_c.get("equityvalue")) and row_c.get("equityvalue") != 0:
+        de_ratio = float(row_c["netdebt"] / row_c["equityvalue"])
+
+    return {"revenue_base": revenue_base, "ebit_margin": ebit_margin, "shares": shares,
+            "net_debt": net_debt, "de_ratio": de_ratio}
+
+def resolve_overrides(inputs, base, ov):
+    """Override percents with None filled from model defaults / Assumptions."""
+    defaults = {"Growth (rev %)": 5.0, "EBIT margin (%)": inputs["ebit_margin"] * 100.0,
+                "D&A (% rev)": 5.0, "CapEx (% rev)": 6.0, "ΔNWC (% rev)": 1.0,
+                "Terminal g (%)": base["g_pct"], "Tax rate (%)": base["tax_rate"]}
+    return {k: (ov.get(k) if ov.get(k) is not None else defaults[k]) for k in OVERRIDE_LABELS}
+
+# ----------------- Valuation -----------------
+def _clean(x):
+    return 0.0 if math.isnan(x) or math.isinf(x) else x
+
+def value_company(inputs, base, params, N=N_YEARS):
+    """
+    5-year FCFF DCF with Gordon terminal value. `params` are resolved override percents.
+    Returns WACC, projection rows and the EV -> implied price bridge.
+    """
+    growth = params["Growth (rev %)"]/100.0
+    ebit_margin_use = params["EBIT margin (%)"]/100.0
+    da_d = params["D&A (% rev)"]/100.0
+    capex_d = params["CapEx (% rev)"]/100.0
+    nwc_d = params["ΔNWC (% rev)"]/100.0
+    term_g_d = params["Terminal g (%)"]/100.0
+    tax_d_local = params["Tax rate (%)"]/100.0
+
+    # Relever beta & WACC
+    beta_l = base["beta_u"] * (1 + (1 - tax_d_local) * inputs["de_ratio"])
+    cost_of_equity = base["Rf"]/100.0 + beta_l * (base["ERP"]/100.0)
+    WACC = cost_of_equity
+
+    rows, fcff, pv_fcff = [], [], []
+    for i in range(1, N+1):
+        rev_i = inputs["revenue_base"] * ((1 + growth)**i)
+        ebit_i = rev_i * ebit_margin_use
+        tax_i = ebit_i * tax_d_local
+        nopat_i = ebit_i - tax_i
+        da_i = rev_i * da_d
+        capex_i = rev_i * capex_d
+        dNWC_i = rev_i * nwc_d
+        fcff_i = nopat_i + da_i - capex_i - dNWC_i
+        disc = (1 + WACC)**i
+        pv_i = fcff_i / disc
+        fcff.append(fcff_i); pv_fcff.append(pv_i)
+        rows.append([2025 + i, rev_i, ebit_i, tax_i, nopat_i, da_i, capex_i, dNWC_i, fcff_i, 1/disc, pv_i])
+
+    eff_wacc = max(WACC, term_g_d + 0.001)
+    tv = (fcff[-1] * (1 + term_g_d)) / (eff_wacc - term_g_d)
+    pv_tv = tv / ((1 + eff_wacc)**N)
+    EV = sum(pv_fcff) + pv_tv
+    shares = inputs["shares"]
+    Equity = EV - _clean(inputs["net_debt"])
+    implied = Equity / shares if shares and not math.isnan(shares) else float("nan")
+
+    return {"beta_l": beta_l, "wacc": WACC, "term_g": term_g_d, "rows": rows, "fcff": fcff,
+            "pv_tv": pv_tv, "ev": EV, "equity": Equity, "implied": implied}
+
+def implied_at(fcff, w, gterm, net_debt, shares, N=N_YEARS):
+    """Implied price re-discounting a fixed FCFF stream at WACC `w` and terminal growth `gterm` (decimals)."""
+    if not shares or math.isnan(shares) or math.isinf(shares):
+        return None
+    pv_stream = sum(fcff[j-1] / ((1 + w)**j) for j in range(1, N+1))
+    weff = max(w, gterm + 0.001)
+    tvv = (fcff[-1] * (1 + gterm)) / (weff - gterm)
+    pv_tvv = tvv / ((1 + weff)**N)
+    evv = pv_stream + pv_tvv
+    eqv = evv - _clean(net_debt)
+    val = eqv / shares
+    return None if math.isnan(val) or math.isinf(val) else val
+
+def sensitivity_points(wacc, term_g):
+    wacc_pts = [max(0.02, wacc - 0.02), max(0.02, wacc - 0.01), wacc, wacc + 0.01, wacc + 0.02]
+    g_pts = [term_g - 0.005, term_g, term_g + 0.005, term_g + 0.010]
+    return wacc_pts, g_pts
+
+def sensitivity_grid(res, inputs, wacc_pts=None, g_pts=None):
+    """Implied price for each (g, WACC) pair; rows follow g_pts, columns wacc_pts."""
+    d_w, d_g = sensitivity_points(res["wacc"], res["term_g"])
+    wacc_pts = d_w if wacc_pts is None else wacc_pts
+    g_pts = d_g if g_pts is None else g_pts
+    grid = [[implied_at(res["fcff"], w, g, inputs["net_debt"], inputs["shares"]) for w in wacc_pts] for g in g_pts]
+    return wacc_pts, g_pts, grid
@@ -0,0 +1,156 @@
+# src/frames_financials.py
+# Cross-sectional alternative to pulling every filer's companyfacts: SEC's XBRL "frames" API returns
+# one tag/unit/period for all filers in a single response, so a refresh is (tags x years) requests
+# instead of one per company. Output is the same data_proc/financials_tidy.csv the other paths write.
+# fy on this path is the calendar year of the frame (CY2023 / CY2023Q4I), not the filer's fiscal year:
+# SEC files a June-2023 fiscal year under whichever CY it overlaps most, so non-December filers can
+# sit one year off from the fy normalize_financials.py takes from companyfacts. Calendar-year filers
+# match companyfacts for every fact that carries a frame.
+#
+#   python src\frames_financials.py --from-year 2020 --to-year 2024
+#   python src\frames_financials.py --base-url http://127.0.0.1:8766   (local fixture server)
+import argparse, datetime, json, time
+from config import CIK_MAP, HEADERS, require_user_agent
+from normalize_financials import TAG_MAP, save_tidy
+from shard import parse_shard, in_shard, shard_root
+
+BASE = "https://data.sec.gov/api/xbrl/frames"
+URL = "{base}/us-gaap/{tag}/{unit}/{period}.json"
+
+# Columns build_comps_and_model.py reads; the rest of TAG_MAP is companyfacts-only
+FRAME_ITEMS = ["revenue", "ebit", "da", "cash", "debt", "diluted_shares"]
+
+# Balance-sheet tags are point-in-time: they live in the instant frame (CY2023Q4I), not CY2023
+INSTANT_TAGS = set(TAG_MAP["cash"]) | set(TAG_MAP["debt"]) | {"CommonStockSharesOutstanding"}
+
+def frame_spec(item, tag, year):
+    """(unit, period) for one TAG_MAP tag in calendar year `year`."""
+    unit = "shares" if item == "diluted_shares" else "USD"
+    period = f"CY{year}Q4I" if tag in INSTANT_TAGS else f"CY{year}"
+    return unit, period
+
+# SEC answers 429/503 under load; retry those (and dropped connections) before giving up on the run
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def fetch_frame(tag, unit, period, base=BASE, retries=4, backoff=2.0):
+    """
+    Parsed frame payload, or None when SEC has no frame for this tag/unit/period (404).
+    429/5xx and connection errors are retried `retries` times, waiting backoff * 2**attempt seconds
+    (or the server's Retry-After) in between.
+    """
+    import requests
+    headers = require_user_agent() if base == BASE else HEADERS
+    url = URL.format(base=base.rstrip("/"), tag=tag, unit=unit, period=period)
+    for attempt in range(retries + 1):
+        try:
+            r = requests.get(url, headers=headers, timeout=60)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == retries:
+                raise
+            wait, why = backoff * 2 ** attempt, type(e).__name__
+        else:
+            if r.status_code == 404:
+                return None
+            if r.status_code not in RETRY_STATUS or attempt == retries:
+                r.raise_for_status()
+                return r.json()
+            after = r.headers.get("Retry-After", "")
+            wait = float(after) if after.isdigit() else backoff * 2 ** attempt
+            why = f"HTTP {r.status_code}"
+        print(f"[WARN] {tag}/{unit}/{period}: {why}; retry {attempt + 1}/{retries} in {wait:.0f}s")
+        time.sleep(wait)
+
+def frames_tidy(years, ciks=None, items=FRAME_ITEMS, base=BASE, pause=0.2, raw_dir=None, resume=False):
+    """
+    {(cik, fy): {item: val}} from frames, taking TAG_MAP tags in priority order per period.
+    fy is the frame's calendar year (see module header), whatever the filer's fiscal year end.
+    With `ciks` (ints) a fallback tag is only requested while some of those filers still lack the
+    item for that year; with ciks=None every tag is pulled for all filers.
+    Each fetched frame is saved under `raw_dir` as it arrives; with `resume`, frames already saved
+    there (e.g. by a run that stopped part-way) are read back instead of requested again.
+    """
+    facts, n_req = {}, 0
+    for item in items:
+        for year in years:
+            for tag in TAG_MAP[item]:
+                if ciks is not None and all(item in facts.get((c, year), {}) for c in ciks):
+                    break
+                unit, period = frame_spec(item, tag, year)
+                out = None if raw_dir is None else raw_dir / "us-gaap" / tag / unit / f"{period}.json"
+                if resume and out is not None and out.exists():
+                    payload = json.loads(out.read_text())
+                else:
+                    payload = fetch_frame(tag, unit, period, base)
+                    n_req += 1
+                    time.sleep(pause)  # stay under SEC fair-access limits
+                    if payload is not None and out is not None:
+                        out.parent.mkdir(parents=True, exist_ok=True)
+                        tmp = out.with_suffix(".part")
+                        tmp.write_text(json.dumps(payload))
+                        tmp.replace(out)  # a run killed mid-write never leaves a truncated cache file
+                if payload is None:
+                    continue
+                for d in payload.get("data", []):
+                    cik = int(d["cik"])
+                    if ciks is not None and cik not in ciks:
+                        continue
+                    row = facts.setdefault((cik, year), {})
+                    if item not in row and d.get("val") is not None:
+                        row[item] = d["val"]
+    return facts, n_req
+
+def run(shard=None, from_year=None, to_year=None, all_filers=False, base=BASE, pause=0.2, save_raw=False,
+        resume=False):
+    import pandas as pd
+    to_year = to_year or datetime.date.today().year - 1
+    from_year = from_year or to_year - 4
+    years = list(range(from_year, to_year + 1))
+    root = shard_root(shard)
+    raw_dir = None
+    if save_raw or resume:
+        raw_dir = root / "data_raw/frames"
+
+    by_cik = {int(c): t for t, c in CIK_MAP.items() if in_shard(t, shard)}
+    if base == BASE and (by_cik or all_filers):
+        require_user_agent()
+    t0 = time.perf_counter()
+    facts, n_req = frames_tidy(years, None if all_filers else set(by_cik), base=base, pause=pause,
+                               raw_dir=raw_dir, resume=resume)
+
+    rows = []
+    for (cik, fy), vals in facts.items():
+        tkr = by_cik.get(cik, f"CIK{cik:010d}")  # unmapped filers keep a stable CIK key
+        if in_shard(tkr, shard):
+            rows.append({"ticker": tkr, "fy": fy, **vals})
+    if not rows and (shard is None or by_cik):
+        raise SystemExit("[ERR] No frame facts matched the universe.")
+    if not rows:
+        print(f"[INFO] no tickers in shard {shard[0]}/{shard[1]}; writing an empty fact set")
+        save_tidy([], root / "data_proc")
+        return
+    df = pd.DataFrame(rows)
+    df = df[["ticker", "fy"] + [c for c in FRAME_ITEMS if c in df.columns]]
+    print(f"frames: {n_req} requests, {df['ticker'].nunique()} filers, "
+          f"CY{from_year}-CY{to_year} in {time.perf_counter()-t0:.1f}s")
+    missing = sorted(t for t in by_cik.values() if t not in set(df["ticker"]))
+    if missing:
+        print("[WARN] no frame facts for:", ", ".join(missing))
+    save_tidy([df], root / "data_proc")
+
+def main():
+    ap = argparse.ArgumentParser(description="Build financials_tidy.csv from SEC XBRL frames (one request per tag/year).")
+    ap.add_argument("--from-year", type=int, default=None, help="first calendar year (default: to-year - 4)")
+    ap.add_argument("--to-year", type=int, default=None, help="last calendar year (default: last year)")
+    ap.add_argument("--all-filers", action="store_true", help="keep every filer in the frames, not just CIK_MAP")
+    ap.add_argument("--base-url", default=BASE, help="frames API root (point at a local fixture server offline)")
+    ap.add_argument("--pause", type=float, default=0.2, help="seconds between requests")
+    ap.add_argument("--save-raw", action="store_true", help="also keep data_raw/frames/us-gaap/{tag}/{unit}/{period}.json")
+    ap.add_argument("--resume", action="store_true",
+                    help="reuse frames already in data_raw/frames (after an interrupted --save-raw run); implies --save-raw")
+    ap.add_argument("--shard", type=parse_shard, default=None, metavar="i/N", help="only this hash partition of tickers")
+    args = ap.parse_args()
+    run(args.shard, args.from_year, args.to_year, args.all_filers, args.base_url, args.pause, args.save_raw,
+        args.resume)
+
+if __name__ == "__main__":
+    main()
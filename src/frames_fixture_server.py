@@ -0,0 +1,104 @@
+# src/frames_fixture_server.py
+# Offline stand-in for the SEC frames API: serves {root}/us-gaap/{tag}/{unit}/{period}.json and 404s
+# anything else, which is the layout `frames_financials.py --save-raw` writes. --build-from turns
+# saved companyfacts JSON into that layout (using each fact's "frame" field) for a first fixture set.
+# --check runs frames_financials.run() against the committed fixtures/frames tree on a throwaway port
+# and compares financials_tidy.csv with the expected files next to it (exit 1 on any difference).
+#
+#   python src\frames_fixture_server.py --root data_raw/frames --build-from data_raw
+#   python src\frames_financials.py --base-url http://127.0.0.1:8766
+#   python src\frames_fixture_server.py --check
+import argparse, json, os, tempfile, threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from config import CIK_MAP
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures" / "frames"
+# (expected file, frames_financials.run kwargs); the fixture frames cover CY2022-CY2023
+CHECKS = [("expected_financials_tidy.csv", {}),
+          ("expected_all_filers.csv", {"all_filers": True})]
+
+class _Handler(SimpleHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+def build_fixtures(companyfacts_dir, root):
+    """Write one frame file per us-gaap tag/unit/frame found in {TKR}_companyfacts.json files."""
+    frames = {}
+    for p in sorted(Path(companyfacts_dir).glob("*_companyfacts.json")):
+        tkr = p.name.split("_")[0]
+        j = json.loads(p.read_text())
+        cik = int(j.get("cik") or CIK_MAP.get(tkr, 0))
+        for tag, fact in j.get("facts", {}).get("us-gaap", {}).items():
+            for unit, vals in fact.get("units", {}).items():
+                for v in vals:
+                    if v.get("frame"):
+                        frames.setdefault((tag, unit, v["frame"]), {})[cik] = {
+                            "accn": v.get("accn"), "cik": cik, "entityName": j.get("entityName", tkr),
+                            "loc": None, "end": v.get("end"), "val": v.get("val")}
+    for (tag, unit, period), by_cik in frames.items():
+        out = Path(root) / "us-gaap" / tag / unit / f"{period}.json"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        data = [by_cik[c] for c in sorted(by_cik)]
+        out.write_text(json.dumps({"taxonomy": "us-gaap", "tag": tag, "ccp": period, "uom": unit,
+                                   "pts": len(data), "data": data}))
+    print(f"wrote {len(frames)} frame fixtures under {Path(root).as_posix()}/")
+
+def check(root=FIXTURES, from_year=2022, to_year=2023):
+    """Run frames_financials against `root` served on localhost; True when every CHECKS output matches."""
+    import pandas as pd
+    import frames_financials
+    root = Path(root).resolve()
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), partial(_Handler, directory=str(root)))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    ok, cwd = True, os.getcwd()
+    try:
+        for name, kwargs in CHECKS:
+            with tempfile.TemporaryDirectory() as tmp:
+                os.chdir(tmp)
+                try:
+                    frames_financials.run(from_year=from_year, to_year=to_year, base=base, pause=0, **kwargs)
+                    got = pd.read_csv("data_proc/financials_tidy.csv", encoding="utf-8-sig")
+                finally:
+                    os.chdir(cwd)
+            want = pd.read_csv(root / name, encoding="utf-8-sig")
+            try:
+                pd.testing.assert_frame_equal(got, want, check_dtype=False, check_exact=True)
+                print(f"[OK] {name}")
+            except AssertionError as e:
+                ok = False
+                print(f"[FAIL] {name}: {e}")
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    return ok
+
+def run(root, host="127.0.0.1", port=8766, build_from=None):
+    if build_from:
+        build_fixtures(build_from, root)
+    srv = ThreadingHTTPServer((host, port), partial(_Handler, directory=str(root)))
+    print(f"frames fixtures from {Path(root).as_posix()} on http://{host}:{port}  (Ctrl+C to stop)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve SEC frames fixtures over localhost HTTP.")
+    ap.add_argument("--root", default="data_raw/frames", help="fixture directory (us-gaap/{tag}/{unit}/{period}.json)")
+    ap.add_argument("--build-from", default=None, help="first build fixtures from this folder of *_companyfacts.json")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--check", action="store_true",
+                    help=f"run frames_financials against {FIXTURES.parent.name}/{FIXTURES.name} and compare with the expected CSVs")
+    args = ap.parse_args()
+    if args.check:
+        raise SystemExit(0 if check() else 1)
+    run(args.root, args.host, args.port, args.build_from)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# src/merge_shards.py
+# Combine shards/{i}of{N}/ ingestion outputs (financials_tidy, latest_prices, latest_rf) into data_proc/,
+# then build comps, the per-company DCFs and DCF_Model once on the merged universe. Universe-level
+# statistics (share-unit median, pack means/medians, Rf) therefore never depend on N.
+# Output order is fixed (tickers sorted) so the same shard set always merges to the same files.
+import argparse, re
+from pathlib import Path
+from shard import SHARDS_DIR
+import build_comps_and_model, build_dcf_per_company, build_dcf_tab
+
+def find_shards(base=SHARDS_DIR):
+    """{i: dir} for one complete shards/{i}of{N} set; errors on mixed N or missing shards."""
+    found = {}
+    for d in sorted(base.glob("*of*")):
+        m = re.fullmatch(r"(\d+)of(\d+)", d.name)
+        if m and d.is_dir():
+            found.setdefault(int(m.group(2)), {})[int(m.group(1))] = d
+    if not found:
+        raise SystemExit(f"[ERR] No shard outputs under {base.as_posix()}/. Run the stages with --shard i/N first.")
+    if len(found) > 1:
+        raise SystemExit(f"[ERR] Mixed shard counts under {base.as_posix()}/: {sorted(found)}. Remove stale shards.")
+    n, shards = next(iter(found.items()))
+    missing = sorted(set(range(n)) - set(shards))
+    if missing:
+        raise SystemExit(f"[ERR] Missing shard(s) {missing} of {n}.")
+    return dict(sorted(shards.items()))
+
+def _concat_csv(shards, name, sort_cols, encoding=None):
+    import pandas as pd
+    frames = []
+    for d in shards.values():
+        p = d / "data_proc" / name
+        if not p.exists():
+            # A stage that failed in this shard leaves no file; merging the rest would drop its tickers
+            raise SystemExit(f"[ERR] {p.as_posix()} is missing. Rerun shard {d.name} before merging.")
+        frames.append(pd.read_csv(p, encoding=encoding, float_precision="round_trip"))
+    frames = [f for f in frames if not f.empty]  # empty shards write header-only files
+    if not frames:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    df["ticker"] = df["ticker"].astype(str).str.strip().str.upper()
+    dup = df.duplicated(sort_cols, keep=False)
+    if dup.any():
+        raise SystemExit(f"[ERR] {name}: rows for {sorted(df.loc[dup, 'ticker'].unique())} appear in more than one shard.")
+    return df.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+
+def _latest_rf(shards):
+    import pandas as pd
+    frames = [pd.read_csv(d / "data_proc/latest_rf.csv") for d in shards.values()
+              if (d / "data_proc/latest_rf.csv").exists()]
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True).sort_values("date", kind="stable").tail(1)
+
+def saved_overrides(wb_path):
+    """{ticker: overrides} from the {TKR}_DCF tabs of an existing workbook (empty if none)."""
+    from openpyxl import load_workbook
+    from dcf_core import read_overrides
+    if not wb_path.exists():
+        return {}
+    wb = load_workbook(wb_path)
+    return {name[:-len("_DCF")]: read_overrides(wb[name]) for name in wb.sheetnames if name.endswith("_DCF")}
+
+def run(pack_dcf=True, formulas=False):
+    shards = find_shards()
+    print(f"Merging {len(shards)} shard(s):", ", ".join(d.name for d in shards.values()))
+    proc = Path("data_proc")
+    proc.mkdir(exist_ok=True)
+
+    fin = _concat_csv(shards, "financials_tidy.csv", ["ticker", "fy"], encoding="utf-8-sig")
+    if fin is None:
+        raise SystemExit("[ERR] No shard financials_tidy.csv found.")
+    fin.to_csv(proc / "financials_tidy.csv", index=False)
+
+    px = _concat_csv(shards, "latest_prices.csv", ["ticker"])
+    if px is None:
+        raise SystemExit("[ERR] No shard latest_prices.csv found.")
+    px.to_csv(proc / "latest_prices.csv", index=False)
+    # One Rf for the whole universe: the newest observation any shard pulled
+    rf = _latest_rf(shards)
+    if rf is not None:
+        rf.to_csv(proc / "latest_rf.csv", index=False)
+    print(f"Wrote data_proc/{{financials_tidy,latest_prices,latest_rf}}.csv ({fin['ticker'].nunique()} tickers)")
+
+    # build_comps_and_model.py starts a fresh workbook; carry the Excel overrides across it
+    wb_path = Path("model/valuation_pack.xlsx")
+    overrides = saved_overrides(wb_path)
+    build_comps_and_model.run()
+    build_dcf_per_company.run(formulas=formulas, overrides=overrides)
+    if pack_dcf:
+        build_dcf_tab.run()
+
+def main():
+    ap = argparse.ArgumentParser(description="Merge shards/{i}of{N}/ outputs and build comps + DCFs on the merged universe.")
+    ap.add_argument("--formulas", action="store_true", help="write the per-company DCF tabs as Excel formulas")
+    ap.add_argument("--no-pack-dcf", action="store_true",
+                    help="skip rebuilding DCF_Model (pack averages) on the merged universe")
+    args = ap.parse_args()
+    run(pack_dcf=not args.no_pack_dcf, formulas=args.formulas)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-import json, pandas as pd
+import argparse, json
 from pathlib import Path
+from config import CIK_MAP
+from shard import parse_shard, in_shard, shard_root
 
 TAG_MAP = {
     # Revenue / Sales
@@ -74,6 +76,7 @@ TAG_MAP = {
 
 
 def _latest_per_fy(values):
+    import pandas as pd
     rows=[]
     for v in values:
         fy=v.get("fy"); fp=v.get("fp"); end=v.get("end"); form=v.get("form")
@@ -83,8 +86,9 @@ def _latest_per_fy(values):
     df=pd.DataFrame(rows).sort_values(["fy","end"])
     return df.drop_duplicates("fy", keep="last")[["fy","val"]]
 
-def _extract(path):
-    j=json.load(open(path))
+def extract_companyfacts(j):
+    """Tidy per-FY frame from an already-parsed companyfacts dict."""
+    import pandas as pd
     facts=j.get("facts",{}).get("us-gaap",{})
     frames=[]
     for line_item,tags in TAG_MAP.items():
@@ -106,24 +110,55 @@ def _extract(path):
         df=df.merge(f,on="fy",how="outer")
     return df.sort_values("fy")
 
-def main():
+def _extract(path):
+    with open(path) as f:
+        return extract_companyfacts(json.load(f))
+
+def run(shard=None):
+    root=shard_root(shard)
     out=[]
-    for p in Path("data_raw").glob("*_companyfacts.json"):
+    for p in sorted((root/"data_raw").glob("*_companyfacts.json")):
         tkr=p.name.split("_")[0]
+        if not in_shard(tkr, shard):
+            continue
         df=_extract(p)
         if df.empty: 
             print(f"[WARN] no data extracted for {tkr}")
             continue
         df.insert(0,"ticker",tkr)
         out.append(df)
+    owned=[t for t in CIK_MAP if in_shard(t, shard)]
+    if not out and owned:
+        raise SystemExit(f"[ERR] No companyfacts normalized under {(root/'data_raw').as_posix()}/ for "
+                         f"{', '.join(owned)}. Run pull_sec_companyfacts.py first.")
+    done={df["ticker"].iloc[0] for df in out}
+    missing=[t for t in owned if t not in done]
+    if missing:
+        print("[WARN] no facts for:", ", ".join(missing))
     if not out:
-        print("[ERR] No companyfacts JSON found. Run pull_sec_companyfacts.py first.")
-        return
-    allf=pd.concat(out, ignore_index=True)
-    Path("data_proc").mkdir(exist_ok=True)
-    allf.to_csv("data_proc/financials_tidy.csv",index=False)
-    print("saved data_proc/financials_tidy.csv")
+        print(f"[INFO] no tickers in shard {shard[0]}/{shard[1]}; writing an empty fact set")
+    save_tidy(out, root/"data_proc")
+
+def save_tidy(out, proc_dir=Path("data_proc")):
+    """
+    Concatenate per-ticker frames (sorted by ticker, fy) into {proc_dir}/financials_tidy.csv.
+    An empty `out` (a shard with no tickers) writes a header-only file that merge_shards.py skips.
+    """
+    import pandas as pd
+    if not out:
+        out=[pd.DataFrame(columns=["ticker","fy"])]
+    allf=pd.concat(out, ignore_index=True).sort_values(["ticker","fy"], kind="stable")
+    proc_dir.mkdir(parents=True, exist_ok=True)
+    allf.to_csv(proc_dir/"financials_tidy.csv",index=False)
+    print(f"saved {(proc_dir/'financials_tidy.csv').as_posix()}")
     print(allf.tail(6))
+    return allf
+
+def main():
+    ap=argparse.ArgumentParser(description="Normalize data_raw/*_companyfacts.json into data_proc/financials_tidy.csv.")
+    ap.add_argument("--shard", type=parse_shard, default=None, metavar="i/N", help="only this hash partition of tickers")
+    args=ap.parse_args()
+    run(args.shard)
 
 if __name__=="__main__":
     main()
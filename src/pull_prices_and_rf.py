@@ -1,27 +1,50 @@
-import pandas as pd, requests
-import yfinance as yf
-from config import TICKERS, FRED_API_KEY
-
-# Prices (10y, adjusted)
-px = yf.download(TICKERS, period="10y", interval="1d", auto_adjust=True, progress=False)
-px.to_csv("data_raw/prices_10y.csv")
-
-# Risk-free (FRED DGS10)
-if not FRED_API_KEY:
-    raise RuntimeError("FRED_API_KEY missing in .env")
-url = f"https://api.stlouisfed.org/fred/series/observations?series_id=DGS10&file_type=json&api_key={FRED_API_KEY}"
-obs = requests.get(url, timeout=30).json()["observations"]
-rf = (pd.DataFrame(obs)[["date","value"]]
-      .assign(value=lambda d: pd.to_numeric(d["value"], errors="coerce"))
-      .dropna())
-rf.to_csv("data_raw/fred_dgs10.csv", index=False)
-
-# Snapshots for Excel assumptions
-latest_rf = rf.tail(1).iloc[0]
-latest_close = (px["Close"].tail(1).T
-                .reset_index()
-                .rename(columns={"index":"ticker", px["Close"].tail(1).index[0]:"last_price"}))
-latest_close.to_csv("data_proc/latest_prices.csv", index=False)
-pd.DataFrame([{"date": latest_rf["date"], "rf_10y_pct": float(latest_rf["value"])}]).to_csv("data_proc/latest_rf.csv", index=False)
-
-print("saved data_raw/prices_10y.csv, data_raw/fred_dgs10.csv, data_proc/latest_prices.csv, data_proc/latest_rf.csv")
+import argparse
+from config import TICKERS, require_fred_key
+from shard import parse_shard, in_shard, shard_root
+
+def run(shard=None):
+    import pandas as pd, requests
+    root = shard_root(shard)
+    raw, proc = root / "data_raw", root / "data_proc"
+    raw.mkdir(parents=True, exist_ok=True)
+    proc.mkdir(parents=True, exist_ok=True)
+    tickers = [t for t in TICKERS if in_shard(t, shard)]
+    if not tickers:
+        # Header-only file so merge_shards.py sees the shard as done; Rf comes from the other shards
+        pd.DataFrame(columns=["ticker", "last_price"]).to_csv(proc / "latest_prices.csv", index=False)
+        print(f"[INFO] no tickers in shard {shard[0]}/{shard[1]}; wrote an empty latest_prices.csv")
+        return
+
+    import yfinance as yf
+    fred_key = require_fred_key()
+
+    # Prices (10y, adjusted)
+    px = yf.download(tickers, period="10y", interval="1d", auto_adjust=True, progress=False)
+    px.to_csv(raw / "prices_10y.csv")
+
+    # Risk-free (FRED DGS10)
+    url = f"https://api.stlouisfed.org/fred/series/observations?series_id=DGS10&file_type=json&api_key={fred_key}"
+    obs = requests.get(url, timeout=30).json()["observations"]
+    rf = (pd.DataFrame(obs)[["date","value"]]
+          .assign(value=lambda d: pd.to_numeric(d["value"], errors="coerce"))
+          .dropna())
+    rf.to_csv(raw / "fred_dgs10.csv", index=False)
+
+    # Snapshots for Excel assumptions
+    latest_rf = rf.tail(1).iloc[0]
+    latest_close = (px["Close"].tail(1).T
+                    .reset_index()
+                    .rename(columns={"index":"ticker", px["Close"].tail(1).index[0]:"last_price"}))
+    latest_close.to_csv(proc / "latest_prices.csv", index=False)
+    pd.DataFrame([{"date": latest_rf["date"], "rf_10y_pct": float(latest_rf["value"])}]).to_csv(proc / "latest_rf.csv", index=False)
+
+    print(f"saved prices_10y.csv, fred_dgs10.csv, latest_prices.csv, latest_rf.csv under {root.as_posix()}/")
+
+def main():
+    ap = argparse.ArgumentParser(description="Pull 10y prices (yfinance) and the 10y Treasury yield (FRED DGS10).")
+    ap.add_argument("--shard", type=parse_shard, default=None, metavar="i/N", help="only this hash partition of tickers")
+    args = ap.parse_args()
+    run(args.shard)
+
+if __name__ == "__main__":
+    main()
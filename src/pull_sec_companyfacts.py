@@ -1,23 +1,41 @@
-import time, json, pathlib, requests
-from config import CIK_MAP, HEADERS
+import argparse, time, json
+from config import CIK_MAP, require_user_agent
+from shard import parse_shard, in_shard, shard_root
 
 BASE = "https://data.sec.gov/api/xbrl/companyfacts/CIK{}.json"
-OUTDIR = pathlib.Path("data_raw")
-OUTDIR.mkdir(parents=True, exist_ok=True)
 
-def get_companyfacts(cik):
+def fetch_companyfacts(cik):
+    """Raw companyfacts payload (bytes) so callers can decide where to parse it."""
+    import requests
     url = BASE.format(cik)
-    r = requests.get(url, headers=HEADERS, timeout=30)
+    r = requests.get(url, headers=require_user_agent(), timeout=30)
     r.raise_for_status()
-    return r.json()
+    return r.content
 
-def main():
+def get_companyfacts(cik):
+    return json.loads(fetch_companyfacts(cik))
+
+def run(shard=None):
+    outdir = shard_root(shard) / "data_raw"
+    outdir.mkdir(parents=True, exist_ok=True)
+    if not any(in_shard(t, shard) for t in CIK_MAP):
+        print(f"[INFO] no tickers in shard {shard[0]}/{shard[1]}; nothing to pull")
+        return
+    require_user_agent()
     for tkr, cik in CIK_MAP.items():
+        if not in_shard(tkr, shard):
+            continue
         data = get_companyfacts(cik)
-        with open(OUTDIR / f"{tkr}_companyfacts.json", "w") as f:
+        with open(outdir / f"{tkr}_companyfacts.json", "w") as f:
             json.dump(data, f)
-        print(f"saved: data_raw/{tkr}_companyfacts.json  (facts: {len(data.get('facts',{}))})")
+        print(f"saved: {outdir.as_posix()}/{tkr}_companyfacts.json  (facts: {len(data.get('facts',{}))})")
         time.sleep(0.2)
 
+def main():
+    ap = argparse.ArgumentParser(description="Download SEC companyfacts JSON for every CIK_MAP company into data_raw/.")
+    ap.add_argument("--shard", type=parse_shard, default=None, metavar="i/N", help="only this hash partition of tickers")
+    args = ap.parse_args()
+    run(args.shard)
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
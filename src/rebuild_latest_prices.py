@@ -1,8 +1,8 @@
 # src/rebuild_latest_prices.py
-import pandas as pd
-import yfinance as yf
+import argparse
 from pathlib import Path
 from config import TICKERS
+from shard import parse_shard, in_shard, shard_root
 
 IN = Path("data_raw/prices_10y.csv")
 OUT = Path("data_proc/latest_prices.csv")
@@ -13,6 +13,7 @@ def from_prices_csv(path: Path):
     handling both MultiIndex (['Close', ticker]) and wide formats ('TDOC Close', etc).
     Returns a DataFrame with columns: ['ticker','last_price'] or None if not possible.
     """
+    import pandas as pd
     try:
         df = pd.read_csv(path, header=[0,1])
         # MultiIndex like ('Close','TDOC'), ('Close','LH'), ...
@@ -40,6 +41,8 @@ def from_prices_csv(path: Path):
 
 def fetch_fallback(tickers):
     """If csv parsing fails, fetch current last close via yfinance per ticker."""
+    import pandas as pd
+    import yfinance as yf
     data = []
     for t in tickers:
         try:
@@ -50,18 +53,31 @@ def fetch_fallback(tickers):
             print(f"[WARN] {t}: fallback fetch failed: {e}")
     return pd.DataFrame(data)
 
-def main():
-    OUT.parent.mkdir(parents=True, exist_ok=True)
-    tidy = from_prices_csv(IN)
+def run(shard=None):
+    src, out = shard_root(shard) / IN, shard_root(shard) / OUT
+    tickers = [t for t in TICKERS if in_shard(t, shard)]
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if not tickers:
+        import pandas as pd
+        pd.DataFrame(columns=["ticker", "last_price"]).to_csv(out, index=False)
+        print(f"[INFO] no tickers in shard {shard[0]}/{shard[1]}; wrote an empty {out.name}")
+        return
+    tidy = from_prices_csv(src)
     if tidy is None or tidy.empty:
         print("[INFO] Could not parse prices_10y.csv reliably; using fallback fetch.")
-        tidy = fetch_fallback(TICKERS)
+        tidy = fetch_fallback(tickers)
     if tidy.empty or "ticker" not in tidy.columns or "last_price" not in tidy.columns:
         raise SystemExit("[ERR] Could not build latest_prices.csv")
     # Keep only our tickers
-    tidy = tidy[tidy["ticker"].isin(TICKERS)].dropna()
-    tidy.to_csv(OUT, index=False)
-    print("Rebuilt", OUT)
+    tidy = tidy[tidy["ticker"].isin(tickers)].dropna()
+    tidy.to_csv(out, index=False)
+    print("Rebuilt", out)
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild data_proc/latest_prices.csv from data_raw/prices_10y.csv.")
+    ap.add_argument("--shard", type=parse_shard, default=None, metavar="i/N", help="only this hash partition of tickers")
+    args = ap.parse_args()
+    run(args.shard)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,185 @@
+# src/reverse_dcf.py
+# Reverse DCF: the revenue growth (or WACC) at which the per-company model's implied price equals
+# the market price in latest_prices.csv. All tickers are solved together on numpy arrays with a
+# bracketed Newton step (bisection fallback), so thousands of names take well under a second.
+import argparse, time
+from pathlib import Path
+from dcf_core import N_YEARS, load_universe, resolve_overrides
+
+def model_arrays(universe):
+    """Universe -> dict of aligned numpy arrays (decimals) for the vectorized model."""
+    import numpy as np
+    base = universe["base"]
+    cols = {k: [] for k in ("rev0", "k", "tax", "de", "tg", "growth", "shares", "net_debt", "price")}
+    tickers = universe["tickers"]
+    for t in tickers:
+        inp = universe["inputs"][t]
+        p = resolve_overrides(inp, base, universe["stored"].get(t, {}))
+        tax = p["Tax rate (%)"]/100.0
+        cols["rev0"].append(inp["revenue_base"])
+        # FCFF_i = revenue_i * k, the same identity value_company() builds line by line
+        cols["k"].append(p["EBIT margin (%)"]/100.0*(1 - tax) + (p["D&A (% rev)"] - p["CapEx (% rev)"] - p["ΔNWC (% rev)"])/100.0)
+        cols["tax"].append(tax)
+        cols["de"].append(inp["de_ratio"])
+        cols["tg"].append(p["Terminal g (%)"]/100.0)
+        cols["growth"].append(p["Growth (rev %)"]/100.0)
+        cols["shares"].append(inp["shares"])
+        cols["net_debt"].append(inp["net_debt"])
+        cols["price"].append(universe["prices"].get(t, float("nan")))
+    m = {k: np.asarray(v, dtype=float) for k, v in cols.items()}
+    m["net_debt"] = np.where(np.isfinite(m["net_debt"]), m["net_debt"], 0.0)
+    beta_l = base["beta_u"] * (1 + (1 - m["tax"]) * m["de"])
+    m["wacc"] = base["Rf"]/100.0 + beta_l * base["ERP"]/100.0
+    m["tickers"] = tickers
+    return m
+
+def implied_and_slope(m, g, w, wrt, N=N_YEARS):
+    """
+    Implied price per ticker at growth `g` and WACC `w` (arrays), plus d(price)/d(g or w).
+    Mirrors value_company(): explicit FCFF at w, Gordon TV at max(w, tg + 0.1%).
+    """
+    import numpy as np
+    i = np.arange(1, N + 1)[:, None]
+    c = m["rev0"] * m["k"]                      # year-0 FCFF scale
+    gp, wp, tg = 1 + g, 1 + w, m["tg"]
+    eff = np.maximum(w, tg + 0.001)
+    ep = 1 + eff
+    stream = (c * gp**i / wp**i).sum(axis=0)
+    tv_num = c * gp**N * (1 + tg)
+    pv_tv = tv_num / (eff - tg) / ep**N
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price = (stream + pv_tv - m["net_debt"]) / m["shares"]
+        if wrt == "growth":
+            d = (c * i * gp**(i - 1) / wp**i).sum(axis=0) + N * pv_tv / gp
+        else:
+            d_tv = np.where(w > tg + 0.001, -pv_tv * (1/(eff - tg) + N/ep), 0.0)
+            d = -(c * i * gp**i / wp**(i + 1)).sum(axis=0) + d_tv
+        slope = d / m["shares"]
+    return price, slope
+
+def solve(m, wrt="growth", lo=None, hi=None, rtol=1e-8, xtol=1e-10, max_iter=60):
+    """
+    Vectorized bracketed Newton: each iteration takes the Newton step where it stays inside the
+    bracket and bisects elsewhere, then shrinks every bracket on the sign of the residual.
+    Returns (x, diagnostics dict of arrays).
+    """
+    import numpy as np
+    n = len(m["price"])
+    target = m["price"]
+    if wrt == "growth":
+        lo = np.full(n, -0.5 if lo is None else lo)
+        hi = np.full(n, 1.0 if hi is None else hi)
+        x0 = m["growth"]
+        f = lambda x: implied_and_slope(m, x, m["wacc"], "growth")
+    else:
+        # WACC below tg + 0.1% only moves the explicit-period discounting; start the bracket there
+        lo = np.maximum(m["tg"] + 0.001, -np.inf if lo is None else lo)
+        hi = np.full(n, 1.0 if hi is None else hi)
+        x0 = m["wacc"]
+        f = lambda x: implied_and_slope(m, m["growth"], x, "wacc")
+
+    f_lo = f(lo)[0] - target
+    f_hi = f(hi)[0] - target
+    has_price = np.isfinite(target) & (target > 0)
+    finite = np.isfinite(f_lo) & np.isfinite(f_hi)
+    bracketed = has_price & finite & (np.sign(f_lo) * np.sign(f_hi) <= 0)
+
+    x = np.clip(np.where(np.isfinite(x0), x0, 0.5*(lo + hi)), lo, hi)
+    active = bracketed.copy()
+    converged = np.zeros(n, dtype=bool)
+    iters = np.zeros(n, dtype=int)
+    newton_steps = np.zeros(n, dtype=int)
+    resid = np.full(n, np.nan)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        val, slope = f(x)
+        r = val - target
+        resid = np.where(active, r, resid)
+        done = active & ((np.abs(r) <= rtol * np.abs(target)) | ((hi - lo) <= xtol))
+        converged |= done
+        active &= ~done
+        if not active.any():
+            break
+        same = np.sign(r) == np.sign(f_lo)
+        lo = np.where(active & same, x, lo)
+        f_lo = np.where(active & same, r, f_lo)
+        hi = np.where(active & ~same, x, hi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = x - r / slope
+        use_newton = np.isfinite(step) & (step > lo) & (step < hi)
+        x = np.where(active, np.where(use_newton, step, 0.5*(lo + hi)), x)
+        newton_steps += active & use_newton
+        iters += active
+
+    status = np.where(~has_price, "no_price",
+             np.where(~finite, "no_model",
+             np.where(~bracketed, "no_bracket",
+             np.where(converged, "ok", "max_iter"))))
+    x = np.where(bracketed, x, np.nan)
+    return x, {"iterations": iters, "newton_steps": newton_steps, "residual": resid,
+               "converged": converged, "status": status}
+
+def run(wrt="growth", lo=None, hi=None, rtol=1e-8, max_iter=60, sheet=False):
+    import pandas as pd
+    root = Path(".")
+    universe = load_universe(root)
+    m = model_arrays(universe)
+
+    t0 = time.perf_counter()
+    x, diag = solve(m, wrt, lo, hi, rtol=rtol, max_iter=max_iter)
+    dt = time.perf_counter() - t0
+    model_px, _ = implied_and_slope(m, m["growth"], m["wacc"], wrt)
+
+    label = "Implied growth (%)" if wrt == "growth" else "Implied WACC (%)"
+    base_label = "Model growth (%)" if wrt == "growth" else "Model WACC (%)"
+    out = pd.DataFrame({
+        "ticker": m["tickers"],
+        "Market Price": m["price"],
+        "Model Price": model_px,
+        base_label: (m["growth"] if wrt == "growth" else m["wacc"]) * 100.0,
+        label: x * 100.0,
+        "Iterations": diag["iterations"],
+        "Newton steps": diag["newton_steps"],
+        "Residual ($)": diag["residual"],
+        "Status": diag["status"],
+    })
+    out_path = root / "data_proc/reverse_dcf.csv"
+    out.to_csv(out_path, index=False)
+    ok = int((diag["status"] == "ok").sum())
+    print(f"reverse DCF ({wrt}): {ok}/{len(out)} converged in {dt*1000:.1f} ms, "
+          f"max {int(diag['iterations'].max(initial=0))} iterations -> {out_path.as_posix()}")
+    bad = out[out["Status"] != "ok"]
+    if not bad.empty:
+        listed = ", ".join(f"{t} ({s})" for t, s in zip(bad["ticker"][:20], bad["Status"][:20]))
+        more = f" ... and {len(bad) - 20} more (see Status column)" if len(bad) > 20 else ""
+        print(f"[WARN] not solved: {listed}{more}")
+
+    if sheet:
+        from openpyxl import load_workbook
+        wb_path = root / "model/valuation_pack.xlsx"
+        wb = load_workbook(wb_path)
+        name = "Reverse_DCF"
+        if name in wb.sheetnames:
+            wb.remove(wb[name])
+        ws = wb.create_sheet(name)
+        ws.append(list(out.columns))
+        for r in out.astype(object).where(pd.notnull(out), None).itertuples(index=False):
+            ws.append(list(r))
+        wb.save(wb_path)
+        print(f"Added/updated {name} tab in {wb_path.name}")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Solve the growth or WACC implied by market prices, all tickers at once.")
+    ap.add_argument("--solve", choices=["growth", "wacc"], default="growth", help="which input to back out")
+    ap.add_argument("--lo", type=float, default=None, help="bracket low (decimal; default -0.5 growth / tg+0.1%% WACC)")
+    ap.add_argument("--hi", type=float, default=None, help="bracket high (decimal; default 1.0)")
+    ap.add_argument("--rtol", type=float, default=1e-8, help="relative price tolerance")
+    ap.add_argument("--max-iter", type=int, default=60)
+    ap.add_argument("--sheet", action="store_true", help="also write a Reverse_DCF tab to the workbook")
+    args = ap.parse_args()
+    run(args.solve, args.lo, args.hi, args.rtol, args.max_iter, args.sheet)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# src/shard.py
+# Hash-partitioning of the ticker universe for multi-process / multi-machine runs.
+# The ingestion stages (pull, frames, prices, normalize) accept `--shard i/N` (0-based i) and then
+# read/write under shards/{i}of{N}/ instead of the repo root; merge_shards.py combines the shard
+# outputs and builds comps/DCFs on the full universe afterwards.
+import hashlib, sys
+from pathlib import Path
+
+SHARDS_DIR = Path("shards")
+
+def parse_shard(spec):
+    """'i/N' -> (i, N) with 0 <= i < N."""
+    try:
+        i, n = (int(x) for x in str(spec).split("/"))
+    except ValueError:
+        raise SystemExit(f"[ERR] --shard expects i/N (e.g. 0/4), got {spec!r}")
+    if n < 1 or not (0 <= i < n):
+        raise SystemExit(f"[ERR] --shard {spec}: need N >= 1 and 0 <= i < N")
+    return i, n
+
+def shard_arg(argv=None):
+    """
+    `--shard i/N` (or `--shard=i/N`) from argv, None when absent. Only the full-universe scripts
+    use this, to refuse the flag; the sharded stages declare --shard on their argparse parsers.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    for k, a in enumerate(argv):
+        if a == "--shard" and k + 1 < len(argv):
+            return parse_shard(argv[k + 1])
+        if a.startswith("--shard="):
+            return parse_shard(a.split("=", 1)[1])
+    return None
+
+def shard_of(ticker, n):
+    """Stable across processes and machines (unlike the salted builtin hash())."""
+    h = hashlib.md5(str(ticker).strip().upper().encode("utf-8")).hexdigest()
+    return int(h, 16) % n
+
+def in_shard(ticker, shard):
+    return shard is None or shard_of(ticker, shard[1]) == shard[0]
+
+def shard_root(shard):
+    """Base directory holding data_raw/, data_proc/ and model/ for this shard."""
+    if shard is None:
+        return Path(".")
+    return SHARDS_DIR / f"{shard[0]}of{shard[1]}"
@@ -0,0 +1,137 @@
+# src/stream_financials.py
+# Streaming alternative to running pull_sec_companyfacts.py then normalize_financials.py:
+# one thread downloads companyfacts while worker threads parse what has already arrived,
+# so network waits and parsing overlap instead of running back to back.
+# Each company's rows land in data_proc/tidy_parts/{TKR}.csv as soon as it is normalized, so finished
+# companies are usable (and survive a crash) while later CIKs are still downloading; the sorted
+# financials_tidy.csv is assembled from those parts at the end.
+import argparse, json, queue, shutil, threading, time
+from config import CIK_MAP, require_user_agent
+from pull_sec_companyfacts import fetch_companyfacts
+from normalize_financials import extract_companyfacts, save_tidy
+from shard import parse_shard, in_shard, shard_root
+
+_DONE = object()
+
+def _producer(cik_map, raw_q, pause, raw_dir, failed):
+    """Download each CIK in turn; put() blocks while the queue is full (backpressure)."""
+    for tkr, cik in cik_map.items():
+        try:
+            payload = fetch_companyfacts(cik)
+        except Exception as e:
+            print(f"[WARN] {tkr}: download failed: {e}")
+            failed[tkr] = f"download failed: {e}"
+            continue
+        if raw_dir is not None:
+            (raw_dir / f"{tkr}_companyfacts.json").write_bytes(payload)
+        raw_q.put((tkr, payload))
+        time.sleep(pause)  # stay under SEC fair-access limits
+
+def _worker(raw_q, out_q):
+    while True:
+        item = raw_q.get()
+        if item is _DONE:
+            out_q.put(_DONE)
+            return
+        tkr, payload = item
+        try:
+            df = extract_companyfacts(json.loads(payload))
+        except Exception as e:
+            print(f"[WARN] {tkr}: normalize failed: {e}")
+            df = None
+        del payload  # release the raw bytes before blocking on the next item
+        out_q.put((tkr, df))
+
+def stream_tidy(cik_map, workers=2, queue_size=4, pause=0.2, raw_dir=None, failed=None):
+    """
+    Yield (ticker, tidy_df) as soon as each company is normalized (tidy_df is None if parsing failed).
+    At most `queue_size` raw payloads wait in memory between download and parse.
+    Pass `raw_dir` to also keep the downloaded JSON on disk, and a dict as `failed` to collect
+    {ticker: reason} for downloads that never reached a worker.
+    """
+    failed = {} if failed is None else failed
+    raw_q = queue.Queue(maxsize=queue_size)
+    out_q = queue.Queue()
+
+    def produce():
+        try:
+            _producer(cik_map, raw_q, pause, raw_dir, failed)
+        finally:
+            for _ in range(workers):
+                raw_q.put(_DONE)
+
+    threads = [threading.Thread(target=produce, name="companyfacts-download", daemon=True)]
+    threads += [threading.Thread(target=_worker, args=(raw_q, out_q), name=f"normalize-{i}", daemon=True)
+                for i in range(workers)]
+    for th in threads:
+        th.start()
+
+    finished = 0
+    while finished < workers:
+        item = out_q.get()
+        if item is _DONE:
+            finished += 1
+            continue
+        yield item
+    for th in threads:
+        th.join()
+
+def _read_parts(paths):
+    import pandas as pd
+    return [pd.read_csv(p, float_precision="round_trip") for p in paths]
+
+def _failure_note(failed):
+    return "".join(f"\n  {t}: {why}" for t, why in sorted(failed.items()))
+
+def run(shard=None, workers=2, queue_size=4, pause=0.2, save_raw=False):
+    root = shard_root(shard)
+    cik_map = {t: c for t, c in CIK_MAP.items() if in_shard(t, shard)}
+    if cik_map:
+        require_user_agent()
+    raw_dir = None
+    if save_raw:
+        raw_dir = root / "data_raw"
+        raw_dir.mkdir(parents=True, exist_ok=True)
+
+    parts_dir = root / "data_proc" / "tidy_parts"
+    shutil.rmtree(parts_dir, ignore_errors=True)  # parts from an earlier run are not this run's output
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    parts, failed = [], {}
+    for tkr, df in stream_tidy(cik_map, workers=max(1, workers), queue_size=max(1, queue_size),
+                               pause=pause, raw_dir=raw_dir, failed=failed):
+        if df is None:
+            failed[tkr] = "normalize failed"
+            continue
+        if df.empty:
+            print(f"[WARN] no data extracted for {tkr}")
+            continue
+        df.insert(0, "ticker", tkr)
+        df.to_csv(parts_dir / f"{tkr}.csv", index=False)
+        parts.append(parts_dir / f"{tkr}.csv")
+        print(f"normalized: {tkr}  (fy {int(df['fy'].min())}-{int(df['fy'].max())})  +{time.perf_counter()-t0:.1f}s")
+    if not parts and cik_map:
+        raise SystemExit("[ERR] No companyfacts normalized." + _failure_note(failed))
+    if not parts:
+        print(f"[INFO] no tickers in shard {shard[0]}/{shard[1]}; writing an empty fact set")
+    save_tidy(_read_parts(parts), root / "data_proc")
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    print(f"streamed {len(parts)}/{len(cik_map)} companies in {time.perf_counter()-t0:.1f}s")
+    if failed:
+        # The fact set above is partial: say so and exit non-zero rather than pass for a full refresh
+        raise SystemExit(f"[ERR] {len(failed)} of {len(cik_map)} companies missing from financials_tidy.csv."
+                         + _failure_note(failed))
+
+def main():
+    ap = argparse.ArgumentParser(description="Download + normalize SEC companyfacts in one overlapped pass.")
+    ap.add_argument("--workers", type=int, default=2, help="normalization worker threads")
+    ap.add_argument("--queue-size", type=int, default=4, help="max downloaded payloads held in memory")
+    ap.add_argument("--pause", type=float, default=0.2, help="seconds between SEC requests")
+    ap.add_argument("--save-raw", action="store_true", help="also write data_raw/{TKR}_companyfacts.json")
+    ap.add_argument("--shard", type=parse_shard, default=None, metavar="i/N", help="only this hash partition of tickers")
+    args = ap.parse_args()
+    run(args.shard, args.workers, args.queue_size, args.pause, args.save_raw)
+
+if __name__ == "__main__":
+    main()
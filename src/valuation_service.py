@@ -0,0 +1,246 @@
+# src/valuation_service.py
+# Long-running localhost JSON service for what-if valuations.
+# Facts, comps, prices, Assumptions and saved per-ticker overrides are loaded once; each query is
+# plain float math from dcf_core, memoized in an LRU keyed by the normalized input set.
+#
+#   python src\valuation_service.py --port 8765
+#   POST /implied      {"ticker": "LH", "overrides": {"growth": 7, "terminal_g": 3}}
+#   POST /sensitivity  {"ticker": "LH", "overrides": {...}, "wacc_points": [8, 9, 10], "g_points": [2, 2.5]}
+#   POST /batch        {"tickers": ["LH", "DGX"], "overrides": {...}}  or  {"queries": [{"ticker": ...}, ...]}
+#   POST /reload       re-read data_proc/ and the workbook, clear the cache
+#   GET  /health, /tickers, /cache
+# Errors come back as JSON: 400 malformed request, 404 unknown ticker, 422 inputs the model cannot
+# evaluate (overflow, zero spread); /batch reports them per query instead of failing the batch.
+# A failed /reload (503 missing or half-written outputs, 500 anything else) keeps the old snapshot.
+import argparse, json, math, time, zipfile
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from dcf_core import OVERRIDE_LABELS, load_universe, resolve_overrides, value_company, sensitivity_grid
+
+# Request keys -> sheet override labels (percents) / Assumptions fields
+OVERRIDE_KEYS = {
+    "growth": "Growth (rev %)", "ebit_margin": "EBIT margin (%)", "da": "D&A (% rev)",
+    "capex": "CapEx (% rev)", "nwc": "ΔNWC (% rev)", "terminal_g": "Terminal g (%)", "tax_rate": "Tax rate (%)",
+}
+ASSUMPTION_KEYS = {"rf": "Rf", "erp": "ERP", "beta_u": "beta_u"}
+
+class BadRequest(ValueError):
+    pass
+
+class Unprocessable(Exception):
+    """Well-formed inputs the model cannot evaluate (overflow, zero WACC spread, ...)."""
+
+def _num(v, what):
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        raise BadRequest(f"{what}: expected a number, got {v!r}")
+    if not math.isfinite(x):
+        raise BadRequest(f"{what}: must be finite")
+    return round(x, 10)  # 5 and 5.0000000000001 share a cache entry
+
+def normalize_overrides(overrides):
+    """Request overrides -> sorted tuple of (field, value); the hashable half of the cache key."""
+    if overrides is None:
+        return ()
+    if not isinstance(overrides, dict):
+        raise BadRequest("overrides must be an object")
+    out = {}
+    for k, v in overrides.items():
+        key = str(k).strip()
+        field = OVERRIDE_KEYS.get(key.lower()) or ASSUMPTION_KEYS.get(key.lower())
+        if field is None and key in OVERRIDE_LABELS:
+            field = key
+        if field is None:
+            raise BadRequest(f"unknown override {k!r}; use one of {sorted(OVERRIDE_KEYS) + sorted(ASSUMPTION_KEYS)}")
+        if v is not None:
+            out[field] = _num(v, key)
+    return tuple(sorted(out.items()))
+
+def _points(v, what):
+    if v is None:
+        return None
+    if not isinstance(v, list) or not v:
+        raise BadRequest(f"{what} must be a non-empty list of percents")
+    return tuple(_num(x, what) for x in v)
+
+def _finite(x):
+    if isinstance(x, float) and not math.isfinite(x):
+        return None
+    if isinstance(x, list):
+        return [_finite(y) for y in x]
+    if isinstance(x, dict):
+        return {k: _finite(y) for k, y in x.items()}
+    return x
+
+class ValuationBook:
+    """In-memory snapshot of one data_proc/ + workbook, with its own LRU of results."""
+
+    def __init__(self, root, cache_size=4096):
+        self.root, self.cache_size = root, cache_size
+        self.load()
+
+    def load(self):
+        t0 = time.perf_counter()
+        state = load_universe(self.root)
+        # One assignment swaps data + cache together, so in-flight requests never mix snapshots
+        self.state = (state, lru_cache(maxsize=self.cache_size)(lambda *key: self._evaluate(state, *key)))
+        self.loaded_at = time.time()
+        print(f"loaded {len(state['tickers'])} tickers from {self.root.as_posix()} in {time.perf_counter()-t0:.2f}s")
+
+    @staticmethod
+    def _evaluate(state, ticker, ov_items, wacc_pts, g_pts, with_grid):
+        inputs = state["inputs"][ticker]
+        base, ov = dict(state["base"]), dict(state["stored"][ticker])
+        for field, v in ov_items:
+            if field in base:
+                base[field] = v
+            else:
+                ov[field] = v
+        params = resolve_overrides(inputs, base, ov)
+        res = value_company(inputs, base, params)
+        mkt = state["prices"].get(ticker)
+        implied = res["implied"]
+        out = {
+            "ticker": ticker, "implied": implied, "market": mkt,
+            "upside_pct": (implied/mkt - 1) * 100.0 if mkt and math.isfinite(implied) else None,
+            "wacc_pct": res["wacc"] * 100.0, "terminal_g_pct": params["Terminal g (%)"],
+            "ev": res["ev"], "equity": res["equity"],
+            "inputs": {**params, "Rf": base["Rf"], "ERP": base["ERP"], "beta_u": base["beta_u"]},
+        }
+        if with_grid:
+            w, g, grid = sensitivity_grid(res, inputs,
+                                          None if wacc_pts is None else [x/100.0 for x in wacc_pts],
+                                          None if g_pts is None else [x/100.0 for x in g_pts])
+            out["sensitivity"] = {"wacc_pct": [x*100.0 for x in w], "g_pct": [x*100.0 for x in g], "implied": grid}
+        return _finite(out)
+
+    def query(self, q, with_grid=False):
+        if not isinstance(q, dict) or not q.get("ticker"):
+            raise BadRequest("each query needs a 'ticker'")
+        state, cached = self.state
+        t = str(q["ticker"]).strip().upper()
+        if t not in state["inputs"]:
+            raise KeyError(t)
+        ov = normalize_overrides(q.get("overrides"))
+        key = (t, ov, None, None, False)
+        if with_grid:
+            key = (t, ov, _points(q.get("wacc_points"), "wacc_points"), _points(q.get("g_points"), "g_points"), True)
+        try:
+            return cached(*key)
+        except (ArithmeticError, ValueError) as e:
+            raise Unprocessable(f"{t}: cannot value with these inputs ({type(e).__name__}: {e})")
+
+    def batch(self, body):
+        if "queries" in body:
+            queries = body["queries"]
+        else:
+            tickers = body.get("tickers") or []
+            if not isinstance(tickers, list):
+                raise BadRequest("'tickers' must be a list")
+            queries = [{**body, "ticker": t} for t in tickers]
+        if not isinstance(queries, list) or not queries:
+            raise BadRequest("batch needs 'queries' or 'tickers' as a non-empty list")
+        results = []
+        for q in queries:
+            try:
+                results.append(self.query(q, with_grid=isinstance(q, dict) and bool(q.get("sensitivity"))))
+            except KeyError as e:
+                results.append({"ticker": e.args[0], "error": "unknown ticker"})
+            except (BadRequest, Unprocessable) as e:
+                results.append({"ticker": q.get("ticker") if isinstance(q, dict) else None, "error": str(e)})
+        return {"results": results}
+
+    def info(self):
+        state, cached = self.state
+        ci = cached.cache_info()
+        return {"hits": ci.hits, "misses": ci.misses, "size": ci.currsize, "maxsize": ci.maxsize,
+                "tickers": len(state["inputs"]), "loaded_at": self.loaded_at}
+
+def make_handler(book, verbose=False):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, payload):
+            data = json.dumps(payload, allow_nan=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(n) or b"{}")
+            except json.JSONDecodeError as e:
+                raise BadRequest(f"invalid JSON: {e}")
+            if not isinstance(body, dict):
+                raise BadRequest("request body must be a JSON object")
+            return body
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", **book.info()})
+            elif self.path == "/tickers":
+                self._send(200, {"tickers": sorted(book.state[0]["inputs"])})
+            elif self.path == "/cache":
+                self._send(200, book.info())
+            else:
+                self._send(404, {"error": f"no route {self.path}"})
+
+        def do_POST(self):
+            try:
+                if self.path == "/implied":
+                    self._send(200, book.query(self._body()))
+                elif self.path == "/sensitivity":
+                    self._send(200, book.query(self._body(), with_grid=True))
+                elif self.path == "/batch":
+                    self._send(200, book.batch(self._body()))
+                elif self.path == "/reload":
+                    try:
+                        book.load()
+                    except (SystemExit, Exception) as e:
+                        # load() swaps state only on success, so the previous snapshot keeps serving.
+                        # SystemExit / unreadable files mean the pipeline outputs are missing or mid-write.
+                        code = 503 if isinstance(e, (SystemExit, OSError, zipfile.BadZipFile)) else 500
+                        self._send(code, {"error": f"reload failed ({type(e).__name__}: {e}); "
+                                                   "still serving the previous snapshot", **book.info()})
+                        return
+                    self._send(200, {"status": "reloaded", **book.info()})
+                else:
+                    self._send(404, {"error": f"no route {self.path}"})
+            except KeyError as e:
+                self._send(404, {"error": f"unknown ticker {e.args[0]!r}"})
+            except BadRequest as e:
+                self._send(400, {"error": str(e)})
+            except Unprocessable as e:
+                self._send(422, {"error": str(e)})
+
+        def log_message(self, fmt, *args):
+            if verbose:
+                super().log_message(fmt, *args)
+
+    return Handler
+
+def run(host="127.0.0.1", port=8765, cache_size=4096, verbose=False):
+    book = ValuationBook(Path("."), cache_size=cache_size)
+    srv = ThreadingHTTPServer((host, port), make_handler(book, verbose))
+    print(f"valuation service on http://{host}:{port}  (Ctrl+C to stop)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve implied-price / sensitivity queries from memory over localhost HTTP.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--cache-size", type=int, default=4096, help="LRU entries (normalized input sets)")
+    ap.add_argument("--verbose", action="store_true", help="log every request")
+    args = ap.parse_args()
+    run(args.host, args.port, args.cache_size, args.verbose)
+
+if __name__ == "__main__":
+    main()